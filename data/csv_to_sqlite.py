@@ -6,6 +6,27 @@ import sqlite3
 import pandas as pd
 import os
 
+# Rows converted and inserted per executemany() call
+BATCH_SIZE = 5000
+
+
+def bulk_insert(conn, table_name, df):
+    """Create table from the DataFrame schema and insert rows via executemany."""
+    # Let pandas derive the column types, but issue the DDL ourselves:
+    # to_sql() would commit the caller's open transaction
+    conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+    conn.execute(pd.io.sql.get_schema(df, table_name))
+    
+    columns = list(df.columns)
+    placeholders = ', '.join('?' * len(columns))
+    sql = f'INSERT INTO "{table_name}" VALUES ({placeholders})'
+    
+    for start in range(0, len(df), BATCH_SIZE):
+        batch = df.iloc[start:start + BATCH_SIZE]
+        # tolist() yields native Python scalars that sqlite3 can bind directly
+        conn.executemany(sql, zip(*(batch[col].tolist() for col in columns)))
+
+
 def convert_csv_to_sqlite():
     """Convert CSV files to SQLite database."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -19,15 +40,42 @@ def convert_csv_to_sqlite():
     
     conn = sqlite3.connect(db_path)
     try:
-        # Convert routes_database.csv
-        routes_df = pd.read_csv(routes_csv)
-        routes_df.to_sql('routes', conn, index=False, if_exists='replace')
-        print(f"Converted routes_database.csv: {len(routes_df)} rows")
+        # The database is rebuilt from scratch, so skip journaling and fsyncs
+        # during the bulk load
+        conn.executescript("""
+            PRAGMA journal_mode=OFF;
+            PRAGMA synchronous=OFF;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-64000;
+            PRAGMA locking_mode=EXCLUSIVE;
+        """)
+        
+        # Load both tables in a single transaction. sqlite3 only opens one
+        # implicitly before DML, so begin explicitly to cover the DDL too
+        with conn:
+            conn.execute("BEGIN")
+            # Convert routes_database.csv
+            routes_df = pd.read_csv(routes_csv)
+            bulk_insert(conn, 'routes', routes_df)
+            print(f"Converted routes_database.csv: {len(routes_df)} rows")
+            
+            # Convert training dataset
+            training_df = pd.read_csv(training_csv)
+            bulk_insert(conn, 'training_data', training_df)
+            print(f"Converted edinburgh_gritting_training_dataset.csv: {len(training_df)} rows")
+            
+            # Lets GET /history read the most recent rows from the index
+            # instead of sorting the whole table
+            conn.execute(
+                "CREATE INDEX idx_training_data_date_time ON training_data (date, time)"
+            )
         
-        # Convert training dataset
-        training_df = pd.read_csv(training_csv)
-        training_df.to_sql('training_data', conn, index=False, if_exists='replace')
-        print(f"Converted edinburgh_gritting_training_dataset.csv: {len(training_df)} rows")
+        # Leave the file in rollback-journal mode: read-only consumers of a
+        # WAL database still need write access to create its -shm file
+        conn.executescript("""
+            PRAGMA journal_mode=DELETE;
+            PRAGMA optimize;
+        """)
     finally:
         conn.close()
     
@@ -1,21 +1,37 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from gritting_predictor import GrittingPredictor
 from gritting_data_service import create_route_service
 from open_meteo_weather_service import OpenMeteoWeatherService, OpenMeteoWeatherServiceError
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+import contextvars
+import functools
+import hashlib
 import math
 import logging
+import operator
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from azure.monitor.opentelemetry import configure_azure_monitor
-from opentelemetry import trace
+from opentelemetry import metrics, trace
 from opentelemetry.instrumentation.flask import FlaskInstrumentor
 from opentelemetry.instrumentation.requests import RequestsInstrumentor
 from opentelemetry.sdk.resources import Resource
 
 # Configure Azure Monitor OpenTelemetry
 # Picks up APPLICATIONINSIGHTS_CONNECTION_STRING from environment automatically.
+# Trace sampling follows OTEL_TRACES_SAMPLER / OTEL_TRACES_SAMPLER_ARG, e.g.
+# microsoft.fixed_percentage / 0.1 to export 10% of request traces.
 # Resource attributes map to App Insights fields for querying:
 #   service.name       → cloud_RoleName
 #   service.version    → application_Version
@@ -32,9 +48,55 @@ if os.environ.get('APPLICATIONINSIGHTS_CONNECTION_STRING'):
 
 tracer = trace.get_tracer(__name__)
 
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson for request parsing and jsonify()."""
+    
+    # Also serialize any numpy scalars coming out of the models
+    OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self.OPTIONS).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Write orjson's bytes straight into the response body
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=self.OPTIONS), mimetype='application/json')
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
+
+def _render_error(message):
+    """Serialize a {'success': False, 'error': ...} body to JSON bytes."""
+    return orjson.dumps({'success': False, 'error': message})
+
+
+# Error bodies returned on hot validation/failure paths, serialized once
+_ERR_INVALID_JSON = _render_error('Request body must be valid JSON')
+_ERR_MISSING_ROUTE_ID = _render_error('Missing required field: route_id')
+_ERR_MISSING_WEATHER = _render_error('Missing required field: weather')
+_ERR_ROUTE_ID_TYPE = _render_error('route_id must be a string')
+_ERR_COORDINATE_TYPE = _render_error('latitude and longitude must be numbers')
+_ERR_LATITUDE_RANGE = _render_error('latitude must be between -90 and 90')
+_ERR_LONGITUDE_RANGE = _render_error('longitude must be between -180 and 180')
+_ERR_SERVICE_UNAVAILABLE = _render_error('Service temporarily unavailable')
+_ERR_WEATHER_UNAVAILABLE = _render_error('Weather service unavailable')
+_ERR_INTERNAL = _render_error('Internal server error')
+
+# Validation messages come from a small fixed set, so cache their bodies too
+_render_validation_error = functools.lru_cache(maxsize=256)(_render_error)
+
+
+def _error_response(body, status):
+    """Build a JSON error response from a pre-rendered body."""
+    return app.response_class(body, status=status, mimetype='application/json')
+
 # Explicitly instrument the Flask app and outbound requests library.
 # This ensures HTTP requests appear in App Insights Requests/Dependencies tables.
 FlaskInstrumentor().instrument_app(app)
@@ -43,6 +105,15 @@ RequestsInstrumentor().instrument()
 # Initialize route service (SQLite by default, CSV fallback)
 route_service = None
 
+# Serialized GET /routes body and its ETag (built on first request), plus the
+# route_lookup they were built from so a reloaded route service rebuilds them
+_routes_payload = None
+_routes_etag = None
+_routes_payload_source = None
+
+# Routes only change on redeploy, so let clients and proxies reuse /routes
+ROUTES_CACHE_MAX_AGE_SECONDS = 3600
+
 # Initialize the prediction system (lazy-load models)
 predictor = None
 _models_loaded = False
@@ -51,12 +122,51 @@ _models_loaded = False
 weather_service = OpenMeteoWeatherService()
 
 
+# Full tracebacks are logged at most once per interval for each error message;
+# repeats in between are logged as one line and counted, so a burst of failures
+# doesn't format a traceback per request
+ERROR_TRACEBACK_INTERVAL_SECONDS = 10
+_error_log_state = {}
+_error_log_lock = threading.Lock()
+_error_counter = metrics.get_meter(__name__).create_counter(
+    'gritting_api.errors',
+    description='Errors returned by the gritting API, by error message'
+)
+
+
+def _log_error(message):
+    """Log the exception being handled, sampling full tracebacks per message."""
+    _error_counter.add(1, {'error.message': message})
+    
+    if not logging.getLogger().isEnabledFor(logging.ERROR):
+        return
+    
+    now = time.monotonic()
+    with _error_log_lock:
+        last_logged, suppressed = _error_log_state.get(message, (None, 0))
+        with_traceback = last_logged is None or now - last_logged >= ERROR_TRACEBACK_INTERVAL_SECONDS
+        if with_traceback:
+            _error_log_state[message] = (now, 0)
+        else:
+            _error_log_state[message] = (last_logged, suppressed + 1)
+    
+    if with_traceback:
+        if suppressed:
+            logging.error("%s (%d more since last traceback)", message, suppressed, exc_info=True)
+        else:
+            logging.error(message, exc_info=True)
+    else:
+        logging.error("%s: %s", message, type(sys.exc_info()[1]).__name__)
+
+
 def get_predictor():
     """
     Lazy-load the predictor and models.
     Returns the predictor if models are loaded, raises error otherwise.
+    Once loading succeeds, this function replaces itself with
+    _get_loaded_predictor so later calls skip the initialization checks.
     """
-    global predictor, _models_loaded, route_service
+    global predictor, _models_loaded, route_service, get_predictor
     
     if route_service is None:
         route_service = create_route_service()
@@ -74,62 +184,89 @@ def get_predictor():
                 "python model_trainer.py"
             ) from e
     
+    get_predictor = _get_loaded_predictor
+    return predictor
+
+
+def _get_loaded_predictor():
+    """Fast path for get_predictor() once the predictor and models are loaded."""
     return predictor
 
 
+# Weather validation rules (built once at import)
+_REQUIRED_WEATHER_FIELDS = (
+    'temperature_c',
+    'feels_like_c',
+    'humidity_pct',
+    'wind_speed_kmh',
+    'precipitation_type',
+    'precipitation_prob_pct',
+    'road_surface_temp_c',
+    'forecast_min_temp_c'
+)
+_REQUIRED_WEATHER_FIELD_SET = frozenset(_REQUIRED_WEATHER_FIELDS)
+
+# Temperature sanity checks (-50°C to +50°C covers extreme but plausible conditions)
+_TEMPERATURE_RANGE_ERROR = "Field '{}' must be between -50 and 50 degrees Celsius"
+
+# (field, minimum, maximum, range error) for every numeric field
+_NUMERIC_WEATHER_RULES = (
+    ('temperature_c', -50, 50, _TEMPERATURE_RANGE_ERROR.format('temperature_c')),
+    ('feels_like_c', -50, 50, _TEMPERATURE_RANGE_ERROR.format('feels_like_c')),
+    ('humidity_pct', 0, 100, "humidity_pct must be between 0 and 100"),
+    ('wind_speed_kmh', 0, math.inf, "wind_speed_kmh cannot be negative"),
+    ('precipitation_prob_pct', 0, 100, "precipitation_prob_pct must be between 0 and 100"),
+    ('road_surface_temp_c', -50, 50, _TEMPERATURE_RANGE_ERROR.format('road_surface_temp_c')),
+    ('forecast_min_temp_c', -50, 50, _TEMPERATURE_RANGE_ERROR.format('forecast_min_temp_c')),
+)
+
+# Exact types accepted for numeric fields (bool is deliberately excluded)
+_NUMBER_TYPES = (int, float)
+
+
+# Pulls the required weather values out of a request dict in field order
+_weather_values_getter = operator.itemgetter(*_REQUIRED_WEATHER_FIELDS)
+
+
 def validate_weather_data(weather):
     """
     Validate weather data has all required fields with valid values.
+    Each numeric field is type, finiteness and range checked in a single
+    pass over a precomputed rule table. Results are memoized per distinct
+    set of values, so repeated payloads are validated with one lookup.
     Returns tuple (is_valid, error_message).
     """
-    required_fields = [
-        'temperature_c',
-        'feels_like_c', 
-        'humidity_pct',
-        'wind_speed_kmh',
-        'precipitation_type',
-        'precipitation_prob_pct',
-        'road_surface_temp_c',
-        'forecast_min_temp_c'
-    ]
-    
     if not isinstance(weather, dict):
         return False, "weather must be an object"
     
-    missing_fields = [f for f in required_fields if f not in weather]
-    if missing_fields:
+    if not _REQUIRED_WEATHER_FIELD_SET.issubset(weather.keys()):
+        missing_fields = [f for f in _REQUIRED_WEATHER_FIELDS if f not in weather]
         return False, f"Missing required weather fields: {', '.join(missing_fields)}"
     
-    # Validate numeric fields
-    numeric_fields = [
-        'temperature_c', 'feels_like_c', 'humidity_pct', 
-        'wind_speed_kmh', 'precipitation_prob_pct',
-        'road_surface_temp_c', 'forecast_min_temp_c'
-    ]
+    values = _weather_values_getter(weather)
+    try:
+        return _validate_weather_values(*values)
+    except TypeError:
+        # Unhashable value (e.g. a list) can't be cached; validate directly
+        return _validate_weather_values.__wrapped__(*values)
+
+
+# typed=True keeps e.g. True and 1 apart, since bools are rejected as numbers
+@functools.lru_cache(maxsize=1024, typed=True)
+def _validate_weather_values(*values):
+    """Validate required weather values given in _REQUIRED_WEATHER_FIELDS order."""
+    weather = dict(zip(_REQUIRED_WEATHER_FIELDS, values))
     
-    for field in numeric_fields:
+    for field, minimum, maximum, range_error in _NUMERIC_WEATHER_RULES:
         value = weather[field]
-        if not isinstance(value, (int, float)):
+        value_type = type(value)
+        if value_type not in _NUMBER_TYPES:
             return False, f"Field '{field}' must be a number"
-        # Reject NaN and infinity values
-        if math.isnan(value) or math.isinf(value):
+        # Reject NaN and infinity values (only floats can hold them)
+        if value_type is float and not math.isfinite(value):
             return False, f"Field '{field}' cannot be NaN or infinity"
-    
-    # Validate ranges
-    if not 0 <= weather['humidity_pct'] <= 100:
-        return False, "humidity_pct must be between 0 and 100"
-    
-    if not 0 <= weather['precipitation_prob_pct'] <= 100:
-        return False, "precipitation_prob_pct must be between 0 and 100"
-    
-    if weather['wind_speed_kmh'] < 0:
-        return False, "wind_speed_kmh cannot be negative"
-    
-    # Temperature sanity checks (-50°C to +50°C covers extreme but plausible conditions)
-    temperature_fields = ['temperature_c', 'feels_like_c', 'road_surface_temp_c', 'forecast_min_temp_c']
-    for field in temperature_fields:
-        if not -50 <= weather[field] <= 50:
-            return False, f"Field '{field}' must be between -50 and 50 degrees Celsius"
+        if not minimum <= value <= maximum:
+            return False, range_error
     
     if not isinstance(weather['precipitation_type'], str) or not weather['precipitation_type']:
         return False, "precipitation_type must be a non-empty string"
@@ -137,6 +274,25 @@ def validate_weather_data(weather):
     return True, None
 
 
+# Predictions are deterministic for a route and its weather values, so identical
+# payloads (e.g. dashboards polling the same route) reuse the earlier result
+@functools.lru_cache(maxsize=4096)
+def _predict_cached(route_id, weather_values):
+    """Predict for weather values given in _REQUIRED_WEATHER_FIELDS order."""
+    pred = get_predictor()
+    weather_data = dict(zip(_REQUIRED_WEATHER_FIELDS, weather_values))
+    return pred.predict_with_route(route_id, pred.route_lookup[route_id], weather_data)
+
+
+def predict_cached(route_id, weather_data):
+    """
+    Return a prediction for already validated weather data, reusing the
+    result of an earlier identical request where possible.
+    """
+    # Copy so callers can't mutate the cached result
+    return dict(_predict_cached(route_id, _weather_values_getter(weather_data)))
+
+
 @app.route('/predict', methods=['POST'])
 def predict_gritting():
     """
@@ -159,43 +315,28 @@ def predict_gritting():
     """
     try:
         # Validate JSON body
-        data = request.json
+        data = request.get_json(silent=True, cache=False)
         if data is None:
-            return jsonify({
-                'success': False,
-                'error': 'Request body must be valid JSON'
-            }), 400
+            return _error_response(_ERR_INVALID_JSON, 400)
         
         # Validate required fields
         if 'route_id' not in data:
-            return jsonify({
-                'success': False,
-                'error': 'Missing required field: route_id'
-            }), 400
+            return _error_response(_ERR_MISSING_ROUTE_ID, 400)
         
         if 'weather' not in data:
-            return jsonify({
-                'success': False,
-                'error': 'Missing required field: weather'
-            }), 400
+            return _error_response(_ERR_MISSING_WEATHER, 400)
         
         route_id = data['route_id']
         weather_data = data['weather']
         
         # Validate route_id type
         if not isinstance(route_id, str):
-            return jsonify({
-                'success': False,
-                'error': 'route_id must be a string'
-            }), 400
+            return _error_response(_ERR_ROUTE_ID_TYPE, 400)
         
         # Validate weather data
         is_valid, error_msg = validate_weather_data(weather_data)
         if not is_valid:
-            return jsonify({
-                'success': False,
-                'error': error_msg
-            }), 400
+            return _error_response(_render_validation_error(error_msg), 400)
         
         # Get predictor (with lazy model loading)
         pred = get_predictor()
@@ -208,12 +349,18 @@ def predict_gritting():
             }), 404
         
         # Make prediction
+        # Attributes are only built when the span is sampled for export
         with tracer.start_as_current_span("predict") as span:
-            span.set_attribute("route.id", route_id)
-            span.set_attribute("weather.temperature_c", weather_data['temperature_c'])
-            span.set_attribute("weather.precipitation_type", weather_data['precipitation_type'])
-            result = pred.predict(route_id, weather_data)
-            span.set_attribute("prediction.gritting_decision", str(result.get('gritting_decision', '')))
+            recording = span.is_recording()
+            if recording:
+                span.set_attributes({
+                    "route.id": route_id,
+                    "weather.temperature_c": weather_data['temperature_c'],
+                    "weather.precipitation_type": weather_data['precipitation_type'],
+                })
+            result = predict_cached(route_id, weather_data)
+            if recording:
+                span.set_attribute("prediction.gritting_decision", result['gritting_decision'])
         
         return jsonify({
             'success': True,
@@ -221,17 +368,11 @@ def predict_gritting():
         }), 200
         
     except RuntimeError as e:
-        logging.error("Service temporarily unavailable", exc_info=True)
-        return jsonify({
-            'success': False,
-            'error': 'Service temporarily unavailable'
-        }), 503
+        _log_error("Service temporarily unavailable")
+        return _error_response(_ERR_SERVICE_UNAVAILABLE, 503)
     except Exception as e:
-        logging.error("Internal server error", exc_info=True)
-        return jsonify({
-            'success': False,
-            'error': 'Internal server error'
-        }), 500
+        _log_error("Internal server error")
+        return _error_response(_ERR_INTERNAL, 500)
 
 
 @app.route('/predict/auto-weather', methods=['POST'])
@@ -248,21 +389,15 @@ def predict_with_auto_weather():
     """
     try:
         # Validate JSON body
-        data = request.json
+        data = request.get_json(silent=True, cache=False)
         if data is None:
-            return jsonify({
-                'success': False,
-                'error': 'Request body must be valid JSON'
-            }), 400
+            return _error_response(_ERR_INVALID_JSON, 400)
         
         # Validate required fields
         required = ['route_id', 'latitude', 'longitude']
         missing = [f for f in required if f not in data]
         if missing:
-            return jsonify({
-                'success': False,
-                'error': f"Missing required fields: {', '.join(missing)}"
-            }), 400
+            return _error_response(_render_validation_error(f"Missing required fields: {', '.join(missing)}"), 400)
         
         route_id = data['route_id']
         lat = data['latitude']
@@ -270,29 +405,17 @@ def predict_with_auto_weather():
         
         # Validate route_id type
         if not isinstance(route_id, str):
-            return jsonify({
-                'success': False,
-                'error': 'route_id must be a string'
-            }), 400
+            return _error_response(_ERR_ROUTE_ID_TYPE, 400)
         
         # Validate coordinates
         if not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
-            return jsonify({
-                'success': False,
-                'error': 'latitude and longitude must be numbers'
-            }), 400
+            return _error_response(_ERR_COORDINATE_TYPE, 400)
         
         if not -90 <= lat <= 90:
-            return jsonify({
-                'success': False,
-                'error': 'latitude must be between -90 and 90'
-            }), 400
+            return _error_response(_ERR_LATITUDE_RANGE, 400)
         
         if not -180 <= lon <= 180:
-            return jsonify({
-                'success': False,
-                'error': 'longitude must be between -180 and 180'
-            }), 400
+            return _error_response(_ERR_LONGITUDE_RANGE, 400)
         
         # Get predictor (with lazy model loading)
         pred = get_predictor()
@@ -305,18 +428,26 @@ def predict_with_auto_weather():
             }), 404
         
         # Fetch weather from API
+        # Attributes are only built when the span is sampled for export
         with tracer.start_as_current_span("fetch_weather") as span:
-            span.set_attribute("weather.latitude", lat)
-            span.set_attribute("weather.longitude", lon)
+            recording = span.is_recording()
+            if recording:
+                span.set_attributes({"weather.latitude": lat, "weather.longitude": lon})
             weather_data = fetch_weather_from_api(lat, lon)
-            span.set_attribute("weather.temperature_c", weather_data['temperature_c'])
-            span.set_attribute("weather.precipitation_type", weather_data['precipitation_type'])
+            if recording:
+                span.set_attributes({
+                    "weather.temperature_c": weather_data['temperature_c'],
+                    "weather.precipitation_type": weather_data['precipitation_type'],
+                })
         
         # Make prediction
         with tracer.start_as_current_span("predict") as span:
-            span.set_attribute("route.id", route_id)
-            result = pred.predict(route_id, weather_data)
-            span.set_attribute("prediction.gritting_decision", str(result.get('gritting_decision', '')))
+            recording = span.is_recording()
+            if recording:
+                span.set_attribute("route.id", route_id)
+            result = predict_cached(route_id, weather_data)
+            if recording:
+                span.set_attribute("prediction.gritting_decision", result['gritting_decision'])
         
         return jsonify({
             'success': True,
@@ -326,33 +457,279 @@ def predict_with_auto_weather():
         }), 200
         
     except RuntimeError as e:
-        logging.error("Service temporarily unavailable", exc_info=True)
-        return jsonify({
-            'success': False,
-            'error': 'Service temporarily unavailable'
-        }), 503
+        _log_error("Service temporarily unavailable")
+        return _error_response(_ERR_SERVICE_UNAVAILABLE, 503)
     except WeatherAPIError as e:
-        logging.error("Weather service unavailable", exc_info=True)
-        return jsonify({
-            'success': False,
-            'error': 'Weather service unavailable'
-        }), 502
+        _log_error("Weather service unavailable")
+        return _error_response(_ERR_WEATHER_UNAVAILABLE, 502)
     except Exception as e:
-        logging.error("Internal server error", exc_info=True)
+        _log_error("Internal server error")
+        return _error_response(_ERR_INTERNAL, 500)
+
+
+# Upper bound on predictions per /predict/batch request
+MAX_BATCH_SIZE = 500
+_ERR_BATCH_TYPE = _render_error('predictions must be a non-empty list')
+_ERR_BATCH_SIZE = _render_error(f'predictions cannot contain more than {MAX_BATCH_SIZE} entries')
+
+
+def _validate_batch_entry(entry):
+    """Validate one /predict/batch entry. Returns an error message, or None if valid."""
+    if not isinstance(entry, dict) or 'route_id' not in entry or 'weather' not in entry:
+        return 'each entry must be an object with route_id and weather'
+    
+    if not isinstance(entry['route_id'], str):
+        return 'route_id must be a string'
+    
+    _, error_msg = validate_weather_data(entry['weather'])
+    return error_msg
+
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    API endpoint for gritting predictions across many routes at once
+    
+    POST /predict/batch
+    Body: {
+        "predictions": [
+            {"route_id": "R001", "weather": {...}},
+            {"route_id": "R002", "weather": {...}}
+        ]
+    }
+    Each entry takes the same fields as POST /predict. All entries are
+    scored with a single model run, and results keep the request order.
+    """
+    try:
+        # Validate JSON body
+        data = request.get_json(silent=True, cache=False)
+        if data is None:
+            return _error_response(_ERR_INVALID_JSON, 400)
+        
+        entries = data.get('predictions') if isinstance(data, dict) else None
+        if not isinstance(entries, list) or not entries:
+            return _error_response(_ERR_BATCH_TYPE, 400)
+        
+        if len(entries) > MAX_BATCH_SIZE:
+            return _error_response(_ERR_BATCH_SIZE, 400)
+        
+        # Get predictor (with lazy model loading)
+        pred = get_predictor()
+        route_lookup = pred.route_lookup
+        
+        # Validate every entry before predicting any of them
+        batch = []
+        for index, entry in enumerate(entries):
+            error_msg = _validate_batch_entry(entry)
+            if error_msg is not None:
+                return jsonify({
+                    'success': False,
+                    'error': f"predictions[{index}]: {error_msg}"
+                }), 400
+            
+            route_id = entry['route_id']
+            route = route_lookup.get(route_id)
+            if route is None:
+                return jsonify({
+                    'success': False,
+                    'error': f"predictions[{index}]: Route '{route_id}' not found. Use GET /routes to see available routes."
+                }), 404
+            batch.append((route_id, route, entry['weather']))
+        
+        with tracer.start_as_current_span("predict_batch") as span:
+            if span.is_recording():
+                span.set_attribute("batch.size", len(batch))
+            results = pred.predict_batch(batch)
+        
         return jsonify({
-            'success': False,
-            'error': 'Internal server error'
-        }), 500
+            'success': True,
+            'predictions': results
+        }), 200
+        
+    except RuntimeError as e:
+        _log_error("Service temporarily unavailable")
+        return _error_response(_ERR_SERVICE_UNAVAILABLE, 503)
+    except Exception as e:
+        _log_error("Internal server error")
+        return _error_response(_ERR_INTERNAL, 500)
 
 
-@app.route('/routes', methods=['GET'])
-def get_routes():
-    """Get all available routes"""
-    global route_service
+# Upper bound on concurrent OpenWeatherMap fallback fetches per batch request
+MAX_WEATHER_FETCH_WORKERS = 16
+
+
+def _validate_auto_weather_entry(entry):
+    """Validate one /predict/auto-weather/batch entry. Returns an error message, or None if valid."""
+    if not isinstance(entry, dict):
+        return 'each entry must be an object with route_id, latitude and longitude'
+    
+    missing = [f for f in ('route_id', 'latitude', 'longitude') if f not in entry]
+    if missing:
+        return f"Missing required fields: {', '.join(missing)}"
+    
+    if not isinstance(entry['route_id'], str):
+        return 'route_id must be a string'
+    
+    lat = entry['latitude']
+    lon = entry['longitude']
+    if not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
+        return 'latitude and longitude must be numbers'
+    
+    if not -90 <= lat <= 90:
+        return 'latitude must be between -90 and 90'
+    
+    if not -180 <= lon <= 180:
+        return 'longitude must be between -180 and 180'
+    
+    return None
+
+
+def fetch_weather_batch(coordinates):
+    """
+    Fetch weather for many (lat, lon) pairs, returning results in the same order.
+    Locations share the per-location cache used by fetch_weather_from_api, and
+    all uncached locations are fetched together in one multi-location
+    Open-Meteo request rather than one round trip each.
+    """
+    # Same keys as the weather cache; the first coordinates seen for a key are fetched
+    keys = [(round(lat, 2), round(lon, 2)) for lat, lon in coordinates]
+    now = time.monotonic()
+    
+    by_location = {}
+    missing = {}
+    for key, coordinate in zip(keys, coordinates):
+        if key in by_location or key in missing:
+            continue
+        weather_data = _get_cached_weather(key, now)
+        if weather_data is None:
+            missing[key] = coordinate
+        else:
+            by_location[key] = weather_data
+    
+    if missing:
+        fetched = _fetch_weather_batch_uncached(list(missing.values()))
+        for key, weather_data in zip(missing, fetched):
+            _cache_weather(key, now, weather_data)
+            by_location[key] = dict(weather_data)
+    
+    return [by_location[key] for key in keys]
+
+
+def _fetch_weather_batch_uncached(coordinates):
+    """Fetch weather for many locations from Open-Meteo, falling back to OpenWeatherMap."""
     try:
-        if route_service is None:
-            route_service = create_route_service()
+        return weather_service.fetch_weather_batch(coordinates)
+    except OpenMeteoWeatherServiceError as e:
+        api_key = os.environ.get('OPENWEATHER_API_KEY')
+        if not api_key:
+            raise WeatherAPIError(f"Open-Meteo error: {str(e)}")
+    
+    # OpenWeatherMap has no multi-location query, so fetch locations concurrently
+    with ThreadPoolExecutor(max_workers=min(len(coordinates), MAX_WEATHER_FETCH_WORKERS)) as executor:
+        # Run each fetch in a copy of this request's context so its spans
+        # stay under the request trace
+        futures = [
+            executor.submit(contextvars.copy_context().run, fetch_weather_from_openweathermap, lat, lon, api_key)
+            for lat, lon in coordinates
+        ]
+        return [future.result() for future in futures]
+
+
+@app.route('/predict/auto-weather/batch', methods=['POST'])
+def predict_batch_with_auto_weather():
+    """
+    API endpoint that fetches weather automatically for many routes at once
+    
+    POST /predict/auto-weather/batch
+    Body: {
+        "predictions": [
+            {"route_id": "R001", "latitude": 55.9533, "longitude": -3.1883},
+            {"route_id": "R002", "latitude": 55.9500, "longitude": -3.2000}
+        ]
+    }
+    Weather for all uncached locations is fetched in one multi-location
+    request, then every entry is scored with a single model run. Results
+    keep the request order.
+    """
+    try:
+        # Validate JSON body
+        data = request.get_json(silent=True, cache=False)
+        if data is None:
+            return _error_response(_ERR_INVALID_JSON, 400)
         
+        entries = data.get('predictions') if isinstance(data, dict) else None
+        if not isinstance(entries, list) or not entries:
+            return _error_response(_ERR_BATCH_TYPE, 400)
+        
+        if len(entries) > MAX_BATCH_SIZE:
+            return _error_response(_ERR_BATCH_SIZE, 400)
+        
+        # Get predictor (with lazy model loading)
+        pred = get_predictor()
+        route_lookup = pred.route_lookup
+        
+        # Validate every entry before fetching any weather
+        for index, entry in enumerate(entries):
+            error_msg = _validate_auto_weather_entry(entry)
+            if error_msg is not None:
+                return jsonify({
+                    'success': False,
+                    'error': f"predictions[{index}]: {error_msg}"
+                }), 400
+            
+            if entry['route_id'] not in route_lookup:
+                return jsonify({
+                    'success': False,
+                    'error': f"predictions[{index}]: Route '{entry['route_id']}' not found. Use GET /routes to see available routes."
+                }), 404
+        
+        with tracer.start_as_current_span("fetch_weather_batch") as span:
+            if span.is_recording():
+                span.set_attribute("batch.size", len(entries))
+            weather = fetch_weather_batch([(entry['latitude'], entry['longitude']) for entry in entries])
+        
+        batch = [
+            (entry['route_id'], route_lookup[entry['route_id']], weather_data)
+            for entry, weather_data in zip(entries, weather)
+        ]
+        with tracer.start_as_current_span("predict_batch") as span:
+            if span.is_recording():
+                span.set_attribute("batch.size", len(batch))
+            results = pred.predict_batch(batch)
+        
+        return jsonify({
+            'success': True,
+            'predictions': [
+                {'prediction': result, 'weather': weather_data}
+                for result, weather_data in zip(results, weather)
+            ],
+            'weather_source': 'open-meteo'
+        }), 200
+        
+    except RuntimeError as e:
+        _log_error("Service temporarily unavailable")
+        return _error_response(_ERR_SERVICE_UNAVAILABLE, 503)
+    except WeatherAPIError as e:
+        _log_error("Weather service unavailable")
+        return _error_response(_ERR_WEATHER_UNAVAILABLE, 502)
+    except Exception as e:
+        _log_error("Internal server error")
+        return _error_response(_ERR_INTERNAL, 500)
+
+
+def get_routes_payload():
+    """
+    Return the serialized GET /routes response body and its ETag.
+    Routes are immutable once loaded, so both are built once and reused
+    until route_service is replaced with a freshly loaded one.
+    """
+    global route_service, _routes_payload, _routes_etag, _routes_payload_source
+    
+    if route_service is None:
+        route_service = create_route_service()
+    
+    route_lookup = route_service.route_lookup
+    if _routes_payload is None or _routes_payload_source is not route_lookup:
         routes = [
             {
                 'route_id': rid,
@@ -362,66 +739,99 @@ def get_routes():
                 'latitude': info['latitude'],
                 'longitude': info['longitude']
             }
-            for rid, info in route_service.route_lookup.items()
+            for rid, info in route_lookup.items()
         ]
-        return jsonify({'routes': routes}), 200
+        payload = orjson.dumps({'routes': routes})
+        _routes_etag = hashlib.blake2b(payload, digest_size=8).hexdigest()
+        _routes_payload = payload
+        _routes_payload_source = route_lookup
+    
+    return _routes_payload, _routes_etag
+
+
+@app.route('/routes', methods=['GET'])
+def get_routes():
+    """Get all available routes"""
+    try:
+        payload, etag = get_routes_payload()
+        response = Response(payload, status=200, mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = ROUTES_CACHE_MAX_AGE_SECONDS
+        # Turns the response into a bodiless 304 when If-None-Match matches
+        return response.make_conditional(request)
     except Exception as e:
-        logging.error("Internal server error", exc_info=True)
-        return jsonify({
-            'success': False,
-            'error': 'Internal server error'
-        }), 500
+        _log_error("Internal server error")
+        return _error_response(_ERR_INTERNAL, 500)
+
+
+# Prediction history comes from the training_data table. Formatting happens in
+# SQL so rows come back as plain tuples ready to zip with the response keys.
+HISTORY_DB_PATH = '../data/gritting_data.db'
+HISTORY_LIMIT = 50
+HISTORY_CACHE_SIZE_KB = 8000
+_HISTORY_QUERY = """
+    SELECT date || 'T' || time || ':00', route_id, route_name, temperature_c,
+           precipitation_type, ice_risk, snow_risk,
+           CASE WHEN gritting_decision = 'gritted' THEN 'yes' ELSE 'no' END,
+           salt_amount_kg
+    FROM training_data
+    ORDER BY date DESC, time DESC
+    LIMIT ?
+"""
+_HISTORY_FIELDS = (
+    'timestamp', 'route_id', 'route_name', 'temperature_c', 'precipitation_type',
+    'ice_risk', 'snow_risk', 'gritting_decision', 'salt_amount_kg'
+)
+
+# One SQLite connection per server thread, opened on first use
+_history_local = threading.local()
+
+
+def _get_history_connection():
+    """Return this thread's SQLite connection for history queries."""
+    conn = getattr(_history_local, 'conn', None)
+    if conn is None:
+        # Read-only: the endpoint never writes, and a missing database is an
+        # error rather than silently created. Readers take shared locks, so
+        # they never block each other.
+        conn = sqlite3.connect(f'file:{HISTORY_DB_PATH}?mode=ro', uri=True)
+        conn.execute("PRAGMA query_only=1")
+        conn.execute(f"PRAGMA cache_size=-{HISTORY_CACHE_SIZE_KB}")
+        _history_local.conn = conn
+    return conn
 
 
 @app.route('/history', methods=['GET'])
 def get_history():
     """Get last 50 prediction history records from database"""
-    import sqlite3
     try:
-        db_path = '../data/gritting_data.db'
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.execute("""
-            SELECT date, time, route_id, route_name, temperature_c, precipitation_type,
-                   ice_risk, snow_risk, gritting_decision, salt_amount_kg
-            FROM training_data
-            ORDER BY date DESC, time DESC
-            LIMIT 50
-        """)
-        history = []
-        for row in cursor:
-            history.append({
-                'timestamp': f"{row['date']}T{row['time']}:00",
-                'route_id': row['route_id'],
-                'route_name': row['route_name'],
-                'temperature_c': row['temperature_c'],
-                'precipitation_type': row['precipitation_type'],
-                'ice_risk': row['ice_risk'],
-                'snow_risk': row['snow_risk'],
-                'gritting_decision': 'yes' if row['gritting_decision'] == 'gritted' else 'no',
-                'salt_amount_kg': row['salt_amount_kg']
-            })
-        conn.close()
+        rows = _get_history_connection().execute(_HISTORY_QUERY, (HISTORY_LIMIT,)).fetchall()
+        history = [dict(zip(_HISTORY_FIELDS, row)) for row in rows]
         return jsonify({'history': history}), 200
     except Exception as e:
-        logging.error("Internal server error", exc_info=True)
-        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+        _log_error("Internal server error")
+        return _error_response(_ERR_INTERNAL, 500)
+
+
+# Body of the healthy /health response, the common case for probes
+_HEALTHY_BODY = orjson.dumps({'status': 'healthy', 'models_loaded': True})
 
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    global _models_loaded
+    # Models never unload once loaded, so later probes skip initialization
+    if _models_loaded:
+        return Response(_HEALTHY_BODY, status=200, mimetype='application/json')
+    
     try:
         # Attempt to initialize predictor and load models if not already done
         get_predictor()
 
         # If models are loaded, the service is healthy
         if _models_loaded:
-            return jsonify({
-                'status': 'healthy',
-                'models_loaded': True
-            }), 200
+            return Response(_HEALTHY_BODY, status=200, mimetype='application/json')
 
         # If initialization returned without error but models are not loaded,
         # treat this as a degraded/unready state.
@@ -432,7 +842,7 @@ def health_check():
         }), 503
     except RuntimeError as e:
         # Expected failure mode when models are missing or cannot be loaded
-        logging.error("Service initialization failed", exc_info=True)
+        _log_error("Service initialization failed")
         return jsonify({
             'status': 'unhealthy',
             'models_loaded': False,
@@ -440,12 +850,38 @@ def health_check():
         }), 503
     except Exception as e:
         # Unexpected internal error during initialization
-        logging.error("Internal server error", exc_info=True)
+        _log_error("Internal server error")
         return jsonify({
             'status': 'unhealthy',
             'models_loaded': False,
             'error': 'Internal server error'
         }), 500
+
+
+# Weather cache (LRU): (rounded lat, rounded lon) -> (fetched at, weather dict)
+WEATHER_CACHE_TTL_SECONDS = 600
+WEATHER_CACHE_MAX_ENTRIES = 1024
+_weather_cache = OrderedDict()
+_weather_cache_lock = threading.Lock()
+
+
+def _create_http_session():
+    """Create a pooled, keep-alive HTTP session with retries for weather APIs."""
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[500, 502, 503, 504],
+        read=False,  # Don't retry read timeouts; surface them as Timeout
+        raise_on_status=False  # Let raise_for_status() map the final response
+    )
+    session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry))
+    return session
+
+
+_http_session = _create_http_session()
+
+
 class WeatherAPIError(Exception):
     """Custom exception for weather API errors"""
     pass
@@ -459,7 +895,43 @@ def fetch_weather_from_api(lat, lon):
     
     Open-Meteo provides accurate precipitation probability and forecast data
     without requiring an API key, making it ideal for this application.
+    
+    Results are cached in-process per ~1 km grid cell (coordinates rounded to
+    2 decimal places) for 10 minutes after they were fetched.
     """
+    key = (round(lat, 2), round(lon, 2))
+    now = time.monotonic()
+    
+    weather_data = _get_cached_weather(key, now)
+    if weather_data is not None:
+        return weather_data
+    
+    weather_data = _fetch_weather_uncached(lat, lon)
+    _cache_weather(key, now, weather_data)
+    return dict(weather_data)
+
+
+def _get_cached_weather(key, now):
+    """Return a copy of the cached weather for key if still fresh, otherwise None."""
+    with _weather_cache_lock:
+        entry = _weather_cache.get(key)
+        if entry is not None and now - entry[0] < WEATHER_CACHE_TTL_SECONDS:
+            _weather_cache.move_to_end(key)
+            return dict(entry[1])
+    return None
+
+
+def _cache_weather(key, fetched_at, weather_data):
+    """Store freshly fetched weather, evicting the least recently used entry when full."""
+    with _weather_cache_lock:
+        _weather_cache[key] = (fetched_at, weather_data)
+        _weather_cache.move_to_end(key)
+        if len(_weather_cache) > WEATHER_CACHE_MAX_ENTRIES:
+            _weather_cache.popitem(last=False)
+
+
+def _fetch_weather_uncached(lat, lon):
+    """Fetch weather from Open-Meteo, falling back to OpenWeatherMap."""
     # Try Open-Meteo first (no API key required)
     try:
         weather_data = weather_service.fetch_weather(lat, lon)
@@ -485,7 +957,7 @@ def fetch_weather_from_openweathermap(lat, lon, api_key):
     url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units=metric"
     
     try:
-        response = requests.get(url, timeout=10)
+        response = _http_session.get(url, timeout=(3.05, 10))
         response.raise_for_status()
         data = response.json()
     except requests.exceptions.Timeout:
@@ -518,23 +990,47 @@ def fetch_weather_from_openweathermap(lat, lon, api_key):
     return weather_data
 
 
+# OpenWeatherMap condition -> precipitation category (built once at import)
+_WEATHER_CONDITION_MAP = {
+    'Clear': 'none',
+    'Clouds': 'none',
+    'Rain': 'rain',
+    'Drizzle': 'rain',
+    'Snow': 'snow',
+    'Sleet': 'sleet',
+    'Mist': 'none',
+    'Fog': 'none'
+}
+
+
 def map_weather_condition(condition):
     """Map API weather condition to our categories"""
-    mapping = {
-        'Clear': 'none',
-        'Clouds': 'none',
-        'Rain': 'rain',
-        'Drizzle': 'rain',
-        'Snow': 'snow',
-        'Sleet': 'sleet',
-        'Mist': 'none',
-        'Fog': 'none'
-    }
-    return mapping.get(condition, 'none')
+    return _WEATHER_CONDITION_MAP.get(condition, 'none')
+
+
+# Load routes and models and serialize the /routes body at import. Under
+# `gunicorn --preload` this happens once in the master and forked workers share
+# the loaded state copy-on-write. If anything is not available yet, requests
+# fall back to lazy loading.
+try:
+    get_routes_payload()
+except Exception:
+    logging.warning("Routes not loaded at startup; will retry on first request")
+
+try:
+    get_predictor()
+except Exception:
+    logging.warning("Models not loaded at startup; will retry on first request", exc_info=True)
 
 
 if __name__ == '__main__':
+    # Development server only. In production the app is served by gunicorn:
+    #   gunicorn --preload --workers 4 --worker-class gthread --threads 8 --bind 0.0.0.0:8080 gritting_api:app
     # Note: debug=True should only be used in development
     # Set FLASK_DEBUG=1 environment variable to enable debug mode
     debug_mode = os.environ.get('FLASK_DEBUG', '0') == '1'
+    logging.warning(
+        "Starting the Flask development server; use gunicorn (see Dockerfile) "
+        "to serve production traffic"
+    )
     app.run(debug=debug_mode, host='0.0.0.0', port=8080)
\ No newline at end of file
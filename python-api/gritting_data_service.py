@@ -4,6 +4,7 @@ Supports SQLite (default) and CSV (fallback) data sources.
 """
 import sqlite3
 import csv
+import functools
 from abc import ABC, abstractmethod
 
 
@@ -40,21 +41,26 @@ class SqliteRouteService(RouteService):
         self._load_routes(db_path)
     
     def _load_routes(self, db_path):
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        # Read-only: routes are never written here, and a missing database
+        # should fail rather than be created empty
+        conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
         try:
-            cursor = conn.execute("SELECT route_id, route_name, priority, road_type, route_length_km, latitude, longitude FROM routes")
-            for row in cursor:
-                self._route_lookup[row['route_id']] = {
-                    'route_name': row['route_name'],
-                    'priority': row['priority'],
-                    'road_type': row['road_type'],
-                    'route_length_km': row['route_length_km'],
-                    'latitude': row['latitude'],
-                    'longitude': row['longitude']
-                }
+            rows = conn.execute("SELECT route_id, route_name, priority, road_type, route_length_km, latitude, longitude FROM routes").fetchall()
         finally:
             conn.close()
+        
+        # Plain tuples unpacked positionally; no per-row sqlite3.Row objects
+        self._route_lookup = {
+            route_id: {
+                'route_name': route_name,
+                'priority': priority,
+                'road_type': road_type,
+                'route_length_km': route_length_km,
+                'latitude': latitude,
+                'longitude': longitude
+            }
+            for route_id, route_name, priority, road_type, route_length_km, latitude, longitude in rows
+        }
     
     def get_routes(self):
         return [{'route_id': rid, **info} for rid, info in self._route_lookup.items()]
@@ -79,7 +85,7 @@ class CsvRouteService(RouteService):
         self._load_routes(csv_path)
     
     def _load_routes(self, csv_path):
-        with open(csv_path, 'r') as f:
+        with open(csv_path, 'r', newline='') as f:
             reader = csv.DictReader(f)
             for row in reader:
                 self._route_lookup[row['route_id']] = {
@@ -106,10 +112,12 @@ class CsvRouteService(RouteService):
         return self._route_lookup
 
 
+@functools.lru_cache(maxsize=1)
 def create_route_service(sqlite_path='../data/gritting_data.db', csv_path='../data/routes_database.csv'):
     """
     Factory function to create appropriate route service.
     Prefers SQLite, falls back to CSV.
+    The service is cached, so routes are loaded at most once per process.
     """
     import os
     
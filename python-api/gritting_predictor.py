@@ -3,29 +3,98 @@ Gritting prediction service - inference only.
 Loads pre-trained models and makes predictions.
 For model training, use model_trainer.py.
 """
+import functools
+import operator
 import pickle
 
+import numpy as np
+import onnxruntime as ort
+
+# Tensor names used when model_trainer.py exports the forests to ONNX
+ONNX_INPUT_NAME = 'features'
+ONNX_PROBABILITIES_OUTPUT = 'probabilities'
+
+# Model encoding of the ice/snow risk levels (matches model_trainer.py)
+RISK_LEVEL_CODES = {'low': 0, 'medium': 1, 'high': 2}
+
+# Precipitation types the models were trained on
+KNOWN_PRECIPITATION_TYPES = frozenset({'none', 'rain', 'sleet', 'snow'})
+
+# Keywords mapping free-text precipitation descriptions onto the known types,
+# checked in this order
+_PRECIPITATION_KEYWORDS = (
+    ('snow', ('snow', 'blizzard', 'flurr')),
+    ('sleet', ('sleet', 'ice', 'hail', 'freez')),
+    ('rain', ('rain', 'drizzle', 'shower', 'storm')),
+)
+
+
+@functools.lru_cache(maxsize=128)
+def _classify_precipitation_text(precip_type):
+    """Map a free-text precipitation description to one of the known types."""
+    precip_lower = precip_type.lower()
+    
+    for known_type, terms in _PRECIPITATION_KEYWORDS:
+        if any(term in precip_lower for term in terms):
+            return known_type
+    
+    return 'none'
+
+
+# Reasons listed in a gritting recommendation, in display order
+_RECOMMENDATION_REASONS = (
+    "high ice risk",
+    "high snow risk",
+    "very low road temperature",
+    "high precipitation probability",
+)
+
+
+def _build_recommendations(priority_text):
+    """Recommendation text for every combination of reasons, indexed by bit flags."""
+    recommendations = []
+    for flags in range(1 << len(_RECOMMENDATION_REASONS)):
+        reasons = [reason for i, reason in enumerate(_RECOMMENDATION_REASONS) if flags >> i & 1]
+        if reasons:
+            recommendations.append(f"{priority_text} - {', '.join(reasons)}")
+        else:
+            recommendations.append(f"{priority_text} - preventive gritting recommended")
+    return tuple(recommendations)
+
+
+# Precomputed recommendations keyed by (priority == 1) then reason flags
+_GRITTING_RECOMMENDATIONS = {
+    True: _build_recommendations("High priority"),
+    False: _build_recommendations("Medium priority"),
+}
+
 
 class GrittingPredictor:
     """
     Inference-only gritting prediction service.
     Loads pre-trained models and makes predictions without sklearn training dependencies.
+    The decision and amount forests are served from ONNX exports via ONNX Runtime.
     """
     
     def __init__(self, route_lookup=None):
         self.decision_model = None
         self.amount_model = None
+        self._amount_input_dtype = np.float64
         self.label_encoders = {}
         self.feature_cols = None
+        self._feature_getter = None
+        self._precipitation_type_codes = {}
         self.route_lookup = route_lookup or {}
     
     def load_models(self, path_prefix='models/gritting'):
         """Load trained models from disk."""
-        with open(f'{path_prefix}_decision_model.pkl', 'rb') as f:
-            self.decision_model = pickle.load(f)
-        
-        with open(f'{path_prefix}_amount_model.pkl', 'rb') as f:
-            self.amount_model = pickle.load(f)
+        self.decision_model = self._load_onnx_model(f'{path_prefix}_decision_model.onnx')
+        self.amount_model = self._load_onnx_model(f'{path_prefix}_amount_model.onnx')
+        # The amount model takes float64 so it matches sklearn exactly; models
+        # exported before that still take float32
+        self._amount_input_dtype = (
+            np.float64 if self.amount_model.get_inputs()[0].type == 'tensor(double)' else np.float32
+        )
         
         with open(f'{path_prefix}_encoders.pkl', 'rb') as f:
             self.label_encoders = pickle.load(f)
@@ -33,11 +102,34 @@ class GrittingPredictor:
         with open(f'{path_prefix}_feature_cols.pkl', 'rb') as f:
             self.feature_cols = pickle.load(f)
         
+        # Compiled once per model load: pulls the feature row out of the
+        # feature dict in model column order in a single C-level call
+        self._feature_getter = operator.itemgetter(*self.feature_cols)
+        
+        # LabelEncoder codes are the indices of its sorted classes_; a plain
+        # dict avoids sklearn's per-call array validation on the hot path
+        self._precipitation_type_codes = {
+            label: code for code, label in enumerate(self.label_encoders['precipitation_type'].classes_.tolist())
+        }
+        
         # Load route_lookup from models if not already set
         if not self.route_lookup:
             with open(f'{path_prefix}_route_lookup.pkl', 'rb') as f:
                 self.route_lookup = pickle.load(f)
     
+    @staticmethod
+    def _load_onnx_model(path):
+        """Create an ONNX Runtime session for a model exported by model_trainer.py."""
+        with open(path, 'rb') as f:
+            model_bytes = f.read()
+        
+        # Predictions are single-row; parallelism comes from the server's worker
+        # processes, so keep each inference call on the request thread
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        return ort.InferenceSession(model_bytes, sess_options=options, providers=['CPUExecutionProvider'])
+    
     def predict(self, route_id, weather_data):
         """
         Make prediction for a specific route and weather conditions.
@@ -46,47 +138,116 @@ class GrittingPredictor:
             route_id: str - Route identifier
             weather_data: dict - Current/forecast weather data
             
+        Returns:
+            dict with prediction results
+        """
+        route = self.route_lookup.get(route_id)
+        if route is None:
+            raise ValueError(f"Route {route_id} not found in database")
+        
+        return self.predict_with_route(route_id, route, weather_data)
+    
+    def predict_with_route(self, route_id, route, weather_data):
+        """
+        Make prediction for a route already resolved from route_lookup.
+        Lets callers that have looked the route up skip a second lookup.
+        
+        Args:
+            route_id: str - Route identifier
+            route: dict - Route metadata (route_lookup entry for route_id)
+            weather_data: dict - Current/forecast weather data
+            
         Returns:
             dict with prediction results
         """
         if self.decision_model is None or self.amount_model is None:
             raise RuntimeError("Models not loaded. Call load_models() first.")
         
-        # Sanitize precipitation type
-        weather_data = weather_data.copy()
-        weather_data['precipitation_type'] = self._sanitize_precipitation_type(
-            weather_data['precipitation_type']
-        )
+        features = self._encode_features(route_id, route, weather_data)
         
-        # Prepare features
-        features = self._prepare_features(route_id, weather_data)
+        # Create feature vector (trees split on float32 features); this single
+        # array is shared by the decision and amount models
+        X_pred = np.array([self._feature_getter(features)], dtype=np.float32)
         
-        # Encode categorical features
-        features_encoded = features.copy()
-        features_encoded['precipitation_type_encoded'] = self.label_encoders['precipitation_type'].transform(
-            [features['precipitation_type']]
-        )[0]
+        # Predict decision
+        decision_proba = self.decision_model.run([ONNX_PROBABILITIES_OUTPUT], {ONNX_INPUT_NAME: X_pred})[0][0]
+        decision = bool(decision_proba[1] > 0.5)
         
-        risk_mapping = {'low': 0, 'medium': 1, 'high': 2}
-        features_encoded['ice_risk_encoded'] = risk_mapping[features['ice_risk']]
-        features_encoded['snow_risk_encoded'] = risk_mapping[features['snow_risk']]
+        # Predict amount if gritting is recommended
+        predicted_amount = None
+        if decision:
+            X_amount = X_pred.astype(self._amount_input_dtype)
+            predicted_amount = float(self.amount_model.run(None, {ONNX_INPUT_NAME: X_amount})[0][0][0])
         
-        # Create feature vector (pandas-free for inference)
-        import pandas as pd
-        X_pred = pd.DataFrame([{col: features_encoded[col] for col in self.feature_cols}])
+        return self._build_result(route_id, features, decision_proba, decision, predicted_amount)
+    
+    def predict_batch(self, batch):
+        """
+        Make predictions for many routes with one model run per model.
         
-        # Predict decision
-        decision_proba = self.decision_model.predict_proba(X_pred)[0]
-        decision = decision_proba[1] > 0.5
-        decision_confidence = decision_proba[1] if decision else decision_proba[0]
+        Args:
+            batch: list of (route_id, route, weather_data) tuples, with each
+                route already resolved from route_lookup
+            
+        Returns:
+            list of prediction result dicts, in the same order as batch
+        """
+        if self.decision_model is None or self.amount_model is None:
+            raise RuntimeError("Models not loaded. Call load_models() first.")
+        
+        if not batch:
+            return []
+        
+        features_list = [self._encode_features(route_id, route, weather_data) for route_id, route, weather_data in batch]
+        X_pred = np.array([self._feature_getter(features) for features in features_list], dtype=np.float32)
+        
+        # One decision run for all rows, then one amount run for just the rows
+        # where gritting is recommended
+        decision_proba = self.decision_model.run([ONNX_PROBABILITIES_OUTPUT], {ONNX_INPUT_NAME: X_pred})[0]
+        decisions = decision_proba[:, 1] > 0.5
+        
+        predicted_amounts = [None] * len(batch)
+        if decisions.any():
+            rows = np.flatnonzero(decisions)
+            X_amount = X_pred[rows].astype(self._amount_input_dtype)
+            amounts = self.amount_model.run(None, {ONNX_INPUT_NAME: X_amount})[0][:, 0]
+            for row, amount in zip(rows.tolist(), amounts.tolist()):
+                predicted_amounts[row] = amount
+        
+        return [
+            self._build_result(route_id, features, proba, bool(decision), predicted_amount)
+            for (route_id, _, _), features, proba, decision, predicted_amount
+            in zip(batch, features_list, decision_proba, decisions, predicted_amounts)
+        ]
+    
+    def _encode_features(self, route_id, route, weather_data):
+        """Prepare the feature dict for one prediction, including encoded columns."""
+        # Sanitize precipitation type (passed alongside, so the caller's
+        # weather dict is neither copied nor modified)
+        precipitation_type = self._sanitize_precipitation_type(weather_data['precipitation_type'])
+        
+        # Prepare features
+        features = self._prepare_features(route_id, route, weather_data, precipitation_type)
+        
+        # Encode categorical features (added alongside the raw values; the
+        # features dict is private to this call, so no copy is needed)
+        features['precipitation_type_encoded'] = self._precipitation_type_codes[features['precipitation_type']]
+        
+        features['ice_risk_encoded'] = RISK_LEVEL_CODES[features['ice_risk']]
+        features['snow_risk_encoded'] = RISK_LEVEL_CODES[features['snow_risk']]
+        
+        return features
+    
+    def _build_result(self, route_id, features, decision_proba, decision, predicted_amount):
+        """Build the prediction result dict from the model outputs for one row."""
+        decision_confidence = float(decision_proba[1] if decision else decision_proba[0])
         
-        # Predict amount if gritting is recommended
         salt_amount = 0
         spread_rate = 0
         estimated_duration = 0
         
         if decision:
-            salt_amount = int(self.amount_model.predict(X_pred)[0])
+            salt_amount = int(predicted_amount)
             route_length = features['route_length_km']
             spread_rate = int(salt_amount / (route_length * 1000) * 1000)
             estimated_duration = int(route_length / 3 * 10) + 5
@@ -106,23 +267,26 @@ class GrittingPredictor:
             'recommendation': recommendation
         }
     
-    def _prepare_features(self, route_id, weather_data):
-        """Prepare features from route ID and weather data."""
-        if route_id not in self.route_lookup:
-            raise ValueError(f"Route {route_id} not found in database")
-        
-        route = self.route_lookup[route_id]
+    def _prepare_features(self, route_id, route, weather_data, precipitation_type):
+        """
+        Prepare features from route metadata and weather data.
+        precipitation_type is the sanitized value, used in place of the raw field.
+        """
+        # Read each weather field once; several feed more than one feature
+        temperature_c = weather_data['temperature_c']
+        precipitation_prob_pct = weather_data['precipitation_prob_pct']
+        road_surface_temp_c = weather_data['road_surface_temp_c']
         
         ice_risk = self._calculate_ice_risk(
-            weather_data['road_surface_temp_c'],
-            weather_data['temperature_c'],
-            weather_data['precipitation_prob_pct']
+            road_surface_temp_c,
+            temperature_c,
+            precipitation_prob_pct
         )
         
         snow_risk = self._calculate_snow_risk(
-            weather_data['temperature_c'],
-            weather_data['precipitation_type'],
-            weather_data['precipitation_prob_pct']
+            temperature_c,
+            precipitation_type,
+            precipitation_prob_pct
         )
         
         return {
@@ -131,19 +295,19 @@ class GrittingPredictor:
             'priority': route['priority'],
             'road_type': route['road_type'],
             'route_length_km': route['route_length_km'],
-            'temperature_c': weather_data['temperature_c'],
+            'temperature_c': temperature_c,
             'feels_like_c': weather_data['feels_like_c'],
             'humidity_pct': weather_data['humidity_pct'],
             'wind_speed_kmh': weather_data['wind_speed_kmh'],
-            'precipitation_type': weather_data['precipitation_type'],
-            'precipitation_prob_pct': weather_data['precipitation_prob_pct'],
-            'road_surface_temp_c': weather_data['road_surface_temp_c'],
+            'precipitation_type': precipitation_type,
+            'precipitation_prob_pct': precipitation_prob_pct,
+            'road_surface_temp_c': road_surface_temp_c,
             'forecast_min_temp_c': weather_data['forecast_min_temp_c'],
             'ice_risk': ice_risk,
             'snow_risk': snow_risk,
-            'temp_below_zero': 1 if weather_data['temperature_c'] < 0 else 0,
-            'surface_temp_below_zero': 1 if weather_data['road_surface_temp_c'] < 0 else 0,
-            'high_precip_prob': 1 if weather_data['precipitation_prob_pct'] > 60 else 0,
+            'temp_below_zero': 1 if temperature_c < 0 else 0,
+            'surface_temp_below_zero': 1 if road_surface_temp_c < 0 else 0,
+            'high_precip_prob': 1 if precipitation_prob_pct > 60 else 0,
         }
     
     def _calculate_ice_risk(self, road_temp, air_temp, precip_prob):
@@ -170,42 +334,25 @@ class GrittingPredictor:
     
     def _sanitize_precipitation_type(self, precip_type):
         """Sanitize precipitation type to handle unknown values."""
-        known_types = ['none', 'rain', 'sleet', 'snow']
-        
         if precip_type is None or not isinstance(precip_type, str):
             return 'none'
         
-        if precip_type in known_types:
+        if precip_type in KNOWN_PRECIPITATION_TYPES:
             return precip_type
         
-        precip_lower = precip_type.lower()
-        
-        if any(term in precip_lower for term in ['snow', 'blizzard', 'flurr']):
-            return 'snow'
-        if any(term in precip_lower for term in ['sleet', 'ice', 'hail', 'freez']):
-            return 'sleet'
-        if any(term in precip_lower for term in ['rain', 'drizzle', 'shower', 'storm']):
-            return 'rain'
-        
-        return 'none'
+        return _classify_precipitation_text(precip_type)
     
     def _generate_recommendation(self, features, decision):
         """Generate human-readable recommendation."""
         if not decision:
             return "No gritting required - conditions safe"
         
-        reasons = []
-        if features['ice_risk'] == 'high':
-            reasons.append("high ice risk")
-        if features['snow_risk'] == 'high':
-            reasons.append("high snow risk")
-        if features['road_surface_temp_c'] < -3:
-            reasons.append("very low road temperature")
-        if features['precipitation_prob_pct'] > 80:
-            reasons.append("high precipitation probability")
-        
-        priority_text = "High priority" if features['priority'] == 1 else "Medium priority"
+        # Bit i set when _RECOMMENDATION_REASONS[i] applies
+        reason_flags = (
+            (features['ice_risk'] == 'high')
+            | ((features['snow_risk'] == 'high') << 1)
+            | ((features['road_surface_temp_c'] < -3) << 2)
+            | ((features['precipitation_prob_pct'] > 80) << 3)
+        )
         
-        if reasons:
-            return f"{priority_text} - {', '.join(reasons)}"
-        return f"{priority_text} - preventive gritting recommended"
+        return _GRITTING_RECOMMENDATIONS[features['priority'] == 1][reason_flags]
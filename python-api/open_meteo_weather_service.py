@@ -3,7 +3,9 @@ Open-Meteo Weather Service for fetching weather data.
 Open-Meteo is a free, open-source weather API that requires no API key.
 """
 import requests
-from typing import Dict
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Tuple
+from urllib3.util.retry import Retry
 
 
 class OpenMeteoWeatherServiceError(Exception):
@@ -31,9 +33,32 @@ class OpenMeteoWeatherService:
     SLEET_CODES = {56, 57, 66, 67, 96, 99}
     RAIN_CODES = {51, 53, 55, 61, 63, 65, 80, 81, 82, 95}
     
+    # Single lookup table built from the code sets above; unlisted codes mean no precipitation
+    PRECIPITATION_BY_CODE = {
+        **{code: 'rain' for code in RAIN_CODES},
+        **{code: 'sleet' for code in SLEET_CODES},
+        **{code: 'snow' for code in SNOW_CODES},
+    }
+    
+    # (connect, read) timeouts in seconds
+    REQUEST_TIMEOUT = (3.05, 10)
+    
+    # Locations per multi-coordinate request, keeping the query string short
+    MAX_LOCATIONS_PER_REQUEST = 100
+    
     def __init__(self):
         """Initialize the Open-Meteo weather service"""
-        pass
+        # One pooled session per service so keep-alive connections (and their
+        # TLS handshakes) are reused across requests
+        self.session = requests.Session()
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[500, 502, 503, 504],
+            read=False,  # Don't retry read timeouts; surface them as Timeout
+            raise_on_status=False  # Let raise_for_status() map the final response
+        )
+        self.session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry))
     
     def fetch_weather(self, latitude: float, longitude: float) -> Dict[str, float]:
         """
@@ -59,8 +84,52 @@ class OpenMeteoWeatherService:
         Raises:
             OpenMeteoWeatherServiceError: If the API request fails
         """
-        # Request current weather and hourly forecast for next 24 hours
-        params = {
+        data = self._request(self._build_params(latitude, longitude))
+        return self._parse_location(data)
+    
+    def fetch_weather_batch(self, coordinates: List[Tuple[float, float]]) -> List[Dict[str, float]]:
+        """
+        Fetch current weather data for many locations.
+        
+        Open-Meteo accepts comma-separated latitudes and longitudes, so up to
+        MAX_LOCATIONS_PER_REQUEST locations are fetched in one round trip.
+        
+        Args:
+            coordinates: List of (latitude, longitude) pairs
+            
+        Returns:
+            list: Weather dicts (same format as fetch_weather), in the order
+                of coordinates
+                
+        Raises:
+            OpenMeteoWeatherServiceError: If any API request fails
+        """
+        if len(coordinates) == 1:
+            return [self.fetch_weather(*coordinates[0])]
+        
+        weather = []
+        for start in range(0, len(coordinates), self.MAX_LOCATIONS_PER_REQUEST):
+            chunk = coordinates[start:start + self.MAX_LOCATIONS_PER_REQUEST]
+            params = self._build_params(
+                ','.join(str(latitude) for latitude, _ in chunk),
+                ','.join(str(longitude) for _, longitude in chunk)
+            )
+            data = self._request(params)
+            
+            # A single location comes back as an object, several as a list
+            if len(chunk) == 1:
+                data = [data]
+            if not isinstance(data, list) or len(data) != len(chunk):
+                raise OpenMeteoWeatherServiceError(
+                    "Unexpected weather API response format: expected one result per location"
+                )
+            weather.extend(self._parse_location(location) for location in data)
+        
+        return weather
+    
+    def _build_params(self, latitude, longitude):
+        """Query parameters for current weather and the next 24 hours' hourly forecast."""
+        return {
             'latitude': latitude,
             'longitude': longitude,
             'current': ','.join([
@@ -78,11 +147,13 @@ class OpenMeteoWeatherService:
             'forecast_days': 1,
             'timezone': 'auto'
         }
-        
+    
+    def _request(self, params):
+        """Call the forecast API and return the decoded JSON body."""
         try:
-            response = requests.get(self.BASE_URL, params=params, timeout=10)
+            response = self.session.get(self.BASE_URL, params=params, timeout=self.REQUEST_TIMEOUT)
             response.raise_for_status()
-            data = response.json()
+            return response.json()
         except requests.exceptions.Timeout:
             raise OpenMeteoWeatherServiceError("Weather API request timed out")
         except requests.exceptions.ConnectionError:
@@ -91,7 +162,9 @@ class OpenMeteoWeatherService:
             raise OpenMeteoWeatherServiceError(f"Weather API error: {e}")
         except requests.exceptions.RequestException as e:
             raise OpenMeteoWeatherServiceError(f"Weather API request failed: {e}")
-        
+    
+    def _parse_location(self, data):
+        """Convert one location's forecast response into a weather dict."""
         try:
             current = data['current']
             hourly = data.get('hourly', {})
@@ -106,23 +179,20 @@ class OpenMeteoWeatherService:
             # Map weather code to precipitation type
             precipitation_type = self._map_weather_code_to_precipitation(weather_code)
             
-            # Get precipitation probability from hourly forecast (next hour)
-            precipitation_prob_pct = 0.0
-            if 'precipitation_probability' in hourly and hourly['precipitation_probability']:
-                precip_probs = hourly['precipitation_probability']
-                if precip_probs:  # Ensure list is not empty
-                    # Get the first non-null probability value (current or next hour)
-                    for prob in precip_probs[:3]:  # Check first 3 hours
-                        if prob is not None:
-                            precipitation_prob_pct = float(prob)
-                            break
+            # Get precipitation probability from hourly forecast: the first
+            # non-null value in the first 3 hours (current or next hour)
+            precip_probs = hourly.get('precipitation_probability') or ()
+            precipitation_prob_pct = next(
+                (float(prob) for prob in precip_probs[:3] if prob is not None),
+                0.0
+            )
             
-            # Get minimum temperature from hourly forecast (next 24 hours)
-            forecast_min_temp_c = temperature_c
-            if 'temperature_2m' in hourly and hourly['temperature_2m']:
-                temps = [t for t in hourly['temperature_2m'] if t is not None]
-                if temps:
-                    forecast_min_temp_c = min(temps)
+            # Get minimum temperature from hourly forecast (next 24 hours),
+            # skipping nulls in a single pass without building a list
+            forecast_min_temp_c = min(
+                (t for t in hourly.get('temperature_2m') or () if t is not None),
+                default=temperature_c
+            )
             
             # Estimate road surface temperature
             road_surface_temp_c = temperature_c - self.ROAD_SURFACE_TEMP_OFFSET_C
@@ -165,17 +235,6 @@ class OpenMeteoWeatherService:
         Returns:
             str: One of 'none', 'rain', 'sleet', 'snow'
         """
-        # Snow conditions
-        if weather_code in self.SNOW_CODES:
-            return 'snow'
-        
-        # Sleet/freezing conditions (freezing rain, freezing drizzle, thunderstorm with hail)
-        if weather_code in self.SLEET_CODES:
-            return 'sleet'
-        
-        # Rain conditions (drizzle, rain, rain showers, thunderstorm)
-        if weather_code in self.RAIN_CODES:
-            return 'rain'
-        
-        # Clear, cloudy, fog - no precipitation
-        return 'none'
+        # Snow, sleet/freezing and rain codes map directly; clear, cloudy and
+        # fog codes are absent and fall back to no precipitation
+        return self.PRECIPITATION_BY_CODE.get(weather_code, 'none')
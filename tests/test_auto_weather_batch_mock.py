@@ -0,0 +1,159 @@
+"""
+Test for the /predict/auto-weather/batch endpoint (with mocked HTTP responses)
+Ensures locations are fetched in one request, cached, and that upstream failures are handled
+"""
+import os
+import sys
+from unittest.mock import Mock, patch
+sys.path.insert(0, '../python-api')
+
+import requests
+from urllib3.exceptions import ReadTimeoutError
+
+# The API loads models/ and ../data/ relative to the python-api directory
+os.chdir('../python-api')
+
+import gritting_api
+from gritting_api import app
+from open_meteo_weather_service import OpenMeteoWeatherService
+
+print("=" * 70)
+print("AUTO-WEATHER BATCH TEST - Python API (mocked)")
+print("=" * 70)
+
+client = app.test_client()
+
+# Open-Meteo results per requested latitude; each location gets its own temperature
+OPEN_METEO_TEMPERATURES = {'55.9533': -3.0, '55.94': 4.0}
+
+
+def open_meteo_location(temperature):
+    """One location's Open-Meteo forecast response."""
+    return {
+        "current": {
+            "temperature_2m": temperature,
+            "apparent_temperature": temperature - 3.5,
+            "relative_humidity_2m": 88.0,
+            "wind_speed_10m": 18.0,
+            "precipitation": 0.5,
+            "weather_code": 71  # Snow fall
+        },
+        "hourly": {
+            "temperature_2m": [temperature, temperature - 1.0],
+            "precipitation_probability": [80.0, 85.0]
+        }
+    }
+
+
+def open_meteo_get(url, params=None, **kwargs):
+    """Answer a (multi-location) Open-Meteo request."""
+    assert url == OpenMeteoWeatherService.BASE_URL
+    latitudes = str(params['latitude']).split(',')
+    response = Mock()
+    response.status_code = 200
+    locations = [open_meteo_location(OPEN_METEO_TEMPERATURES[latitude]) for latitude in latitudes]
+    response.json.return_value = locations if len(locations) > 1 else locations[0]
+    return response
+
+
+def open_meteo_down_get(url, params=None, **kwargs):
+    """Fail Open-Meteo requests and answer OpenWeatherMap ones."""
+    if url == OpenMeteoWeatherService.BASE_URL:
+        raise requests.exceptions.ConnectionError("Open-Meteo unreachable")
+    response = Mock()
+    response.status_code = 200
+    response.json.return_value = {
+        "main": {"temp": 2.0, "feels_like": -1.0, "humidity": 90, "temp_min": 0.5},
+        "wind": {"speed": 5.0},
+        "weather": [{"main": "Sleet"}]
+    }
+    return response
+
+
+# Five entries in two ~1 km cells: three round to (55.95, -3.19), two to (55.94, -3.21)
+entries = [
+    {'route_id': 'R001', 'latitude': 55.9533, 'longitude': -3.1883},
+    {'route_id': 'R002', 'latitude': 55.9512, 'longitude': -3.1901},
+    {'route_id': 'R003', 'latitude': 55.9400, 'longitude': -3.2100},
+    {'route_id': 'R004', 'latitude': 55.9533, 'longitude': -3.1883},
+    {'route_id': 'R005', 'latitude': 55.9401, 'longitude': -3.2099},
+]
+expected_temperatures = [-3.0, -3.0, 4.0, -3.0, 4.0]
+
+os.environ.pop('OPENWEATHER_API_KEY', None)
+gritting_api._weather_cache.clear()
+
+# Test 1: All uncached locations are fetched in one request, one per cell
+print("\n1. Testing one multi-location request per batch...")
+with patch('requests.Session.get', side_effect=open_meteo_get) as mock_get:
+    response = client.post('/predict/auto-weather/batch', json={'predictions': entries})
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+
+    assert mock_get.call_count == 1, f"Expected 1 upstream call, got {mock_get.call_count}"
+    params = mock_get.call_args.kwargs['params']
+    assert params['latitude'] == '55.9533,55.94', params['latitude']
+    assert params['longitude'] == '-3.1883,-3.21', params['longitude']
+    print(f"   ✓ {len(entries)} entries in 2 cells fetched with 1 upstream call")
+
+    assert body['success'] is True
+    assert body['weather_source'] == 'open-meteo'
+    assert len(body['predictions']) == len(entries)
+    for entry, item, temperature in zip(entries, body['predictions'], expected_temperatures):
+        assert item['prediction']['route_id'] == entry['route_id']
+        assert item['weather']['temperature_c'] == temperature
+        assert item['weather']['precipitation_type'] == 'snow'
+    print("   ✓ Each entry gets its own cell's weather, in request order")
+
+    # Test 2: A repeat request is answered from the weather cache
+    print("\n2. Testing weather cache hits...")
+    response = client.post('/predict/auto-weather/batch', json={'predictions': entries})
+    assert response.status_code == 200, response.get_json()
+    assert mock_get.call_count == 1, f"Expected cache hits, got {mock_get.call_count} upstream calls"
+    assert response.get_json()['predictions'] == body['predictions']
+    print("   ✓ Repeat request served from cache without upstream calls")
+
+# Test 3: Upstream failure without a fallback key returns 502
+print("\n3. Testing upstream failure...")
+gritting_api._weather_cache.clear()
+with patch('requests.Session.get', side_effect=requests.exceptions.ConnectionError("unreachable")) as mock_get:
+    response = client.post('/predict/auto-weather/batch', json={'predictions': entries})
+    assert response.status_code == 502, response.status_code
+    assert response.get_json() == {'success': False, 'error': 'Weather service unavailable'}
+    assert len(gritting_api._weather_cache) == 0
+print("   ✓ Upstream failure returns 502 and caches nothing")
+
+# Test 4: OpenWeatherMap fallback fetches each cell once
+print("\n4. Testing OpenWeatherMap fallback...")
+os.environ['OPENWEATHER_API_KEY'] = 'test-key'
+try:
+    with patch('requests.Session.get', side_effect=open_meteo_down_get) as mock_get:
+        response = client.post('/predict/auto-weather/batch', json={'predictions': entries})
+        assert response.status_code == 200, response.get_json()
+        fallback_urls = [call.args[0] for call in mock_get.call_args_list[1:]]
+        assert mock_get.call_args_list[0].args[0] == OpenMeteoWeatherService.BASE_URL
+        assert len(fallback_urls) == 2, fallback_urls
+        assert all(url.startswith('https://api.openweathermap.org/') for url in fallback_urls)
+        for item in response.get_json()['predictions']:
+            assert item['weather']['temperature_c'] == 2.0
+            assert item['weather']['precipitation_type'] == 'sleet'
+finally:
+    del os.environ['OPENWEATHER_API_KEY']
+    gritting_api._weather_cache.clear()
+print("   ✓ Fallback fetches each cell once from OpenWeatherMap")
+
+# Test 5: An OpenWeatherMap read timeout is not retried and maps to the timeout error
+print("\n5. Testing OpenWeatherMap read timeouts...")
+with patch('urllib3.connectionpool.HTTPConnectionPool._make_request') as mock_make_request:
+    mock_make_request.side_effect = ReadTimeoutError(None, 'https://api.openweathermap.org/', "Read timed out.")
+    try:
+        gritting_api.fetch_weather_from_openweathermap(55.9533, -3.1883, 'test-key')
+        raise AssertionError("Expected a timeout error")
+    except gritting_api.WeatherAPIError as e:
+        assert str(e) == "Weather API request timed out", f"Timeout mapped to: {e}"
+    assert mock_make_request.call_count == 1, "Read timeouts should not be retried"
+print("   ✓ Read timeout surfaces as a timeout after one attempt")
+
+print("\n" + "=" * 70)
+print("✓ ALL AUTO-WEATHER BATCH TESTS PASSED")
+print("=" * 70)
@@ -0,0 +1,108 @@
+"""
+Test for the /predict/batch endpoint
+Ensures batch results match single /predict results and that bad batches are rejected
+"""
+import os
+import sys
+sys.path.insert(0, '../python-api')
+
+# The API loads models/ and ../data/ relative to the python-api directory
+os.chdir('../python-api')
+
+from gritting_api import app, MAX_BATCH_SIZE
+
+print("=" * 70)
+print("BATCH PREDICTION TEST - Python API")
+print("=" * 70)
+
+client = app.test_client()
+
+cold_weather = {
+    'temperature_c': -3.5,
+    'feels_like_c': -7.2,
+    'humidity_pct': 88,
+    'wind_speed_kmh': 18,
+    'precipitation_type': 'snow',
+    'precipitation_prob_pct': 85,
+    'road_surface_temp_c': -4.2,
+    'forecast_min_temp_c': -5.0
+}
+mild_weather = {
+    'temperature_c': 8.0,
+    'feels_like_c': 6.5,
+    'humidity_pct': 60,
+    'wind_speed_kmh': 10,
+    'precipitation_type': 'none',
+    'precipitation_prob_pct': 5,
+    'road_surface_temp_c': 7.0,
+    'forecast_min_temp_c': 5.0
+}
+marginal_weather = {
+    'temperature_c': 1.0,
+    'feels_like_c': -2.0,
+    'humidity_pct': 92,
+    'wind_speed_kmh': 25,
+    'precipitation_type': 'sleet',
+    'precipitation_prob_pct': 65,
+    'road_surface_temp_c': 0.2,
+    'forecast_min_temp_c': -1.5
+}
+
+# Test 1: Batch results match single predictions, entry by entry
+print("\n1. Testing batch results against single /predict results...")
+entries = [
+    {'route_id': route_id, 'weather': weather}
+    for route_id in ('R001', 'R002', 'R003', 'R004', 'R005', 'R006', 'R007')
+    for weather in (cold_weather, mild_weather, marginal_weather)
+]
+response = client.post('/predict/batch', json={'predictions': entries})
+assert response.status_code == 200, response.get_json()
+body = response.get_json()
+assert body['success'] is True
+assert len(body['predictions']) == len(entries)
+
+decisions = set()
+for entry, batch_result in zip(entries, body['predictions']):
+    single = client.post('/predict', json=entry)
+    assert single.status_code == 200, single.get_json()
+    assert batch_result == single.get_json()['prediction'], (
+        f"Batch result differs for {entry['route_id']}: {batch_result} != {single.get_json()['prediction']}"
+    )
+    decisions.add(batch_result['gritting_decision'])
+assert decisions == {'yes', 'no'}, f"Expected gritted and non-gritted rows, got {decisions}"
+print(f"   ✓ {len(entries)} batch results match /predict (gritted and non-gritted rows)")
+
+# Test 2: Empty and oversized batches are rejected
+print("\n2. Testing batch size limits...")
+response = client.post('/predict/batch', json={'predictions': []})
+assert response.status_code == 400
+assert response.get_json() == {'success': False, 'error': 'predictions must be a non-empty list'}
+
+response = client.post('/predict/batch', json={'predictions': [entries[0]] * (MAX_BATCH_SIZE + 1)})
+assert response.status_code == 400
+assert str(MAX_BATCH_SIZE) in response.get_json()['error']
+print("   ✓ Empty and oversized batches rejected")
+
+# Test 3: Malformed entries are rejected with their index
+print("\n3. Testing malformed entries...")
+response = client.post('/predict/batch', json={'predictions': [entries[0], {'route_id': 'R001'}]})
+assert response.status_code == 400
+assert response.get_json()['error'].startswith('predictions[1]: ')
+
+invalid_weather = dict(cold_weather, humidity_pct=150)
+response = client.post('/predict/batch', json={'predictions': [{'route_id': 'R001', 'weather': invalid_weather}]})
+assert response.status_code == 400
+assert response.get_json()['error'].startswith('predictions[0]: ')
+assert 'humidity_pct' in response.get_json()['error']
+print("   ✓ Malformed entries rejected")
+
+# Test 4: Unknown routes are reported as not found
+print("\n4. Testing unknown routes...")
+response = client.post('/predict/batch', json={'predictions': [entries[0], {'route_id': 'R999', 'weather': cold_weather}]})
+assert response.status_code == 404
+assert response.get_json()['error'].startswith("predictions[1]: Route 'R999' not found")
+print("   ✓ Unknown routes rejected")
+
+print("\n" + "=" * 70)
+print("✓ ALL BATCH PREDICTION TESTS PASSED")
+print("=" * 70)
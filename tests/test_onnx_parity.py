@@ -0,0 +1,92 @@
+"""
+Parity test for the ONNX models served by the Python API
+Ensures ONNX Runtime salt amounts match the pickled sklearn models they were exported from
+"""
+import pickle
+import random
+import sqlite3
+import sys
+sys.path.insert(0, '../python-api')
+
+import numpy as np
+
+from gritting_predictor import GrittingPredictor
+from gritting_data_service import create_route_service
+
+print("=" * 70)
+print("ONNX PARITY TEST - Python API")
+print("=" * 70)
+
+route_service = create_route_service('../data/gritting_data.db', '../data/routes_database.csv')
+predictor = GrittingPredictor(route_lookup=route_service.route_lookup)
+predictor.load_models('../python-api/models/gritting')
+
+with open('../python-api/models/gritting_amount_model.pkl', 'rb') as f:
+    amount_model = pickle.load(f)
+# Accumulate trees in order, as ONNX Runtime does on one thread
+amount_model.n_jobs = 1
+
+WEATHER_FIELDS = (
+    'temperature_c', 'feels_like_c', 'humidity_pct', 'wind_speed_kmh', 'precipitation_type',
+    'precipitation_prob_pct', 'road_surface_temp_c', 'forecast_min_temp_c'
+)
+
+# Inputs like the training data, where forests often average to whole kilograms
+conn = sqlite3.connect('file:../data/gritting_data.db?mode=ro', uri=True)
+try:
+    training_inputs = [
+        (row[0], dict(zip(WEATHER_FIELDS, row[1:])))
+        for row in conn.execute(f"SELECT route_id, {', '.join(WEATHER_FIELDS)} FROM training_data")
+    ]
+finally:
+    conn.close()
+
+# Uniformly random valid inputs
+rng = random.Random(0)
+random_inputs = [
+    (rng.choice(sorted(route_service.route_lookup)), {
+        'temperature_c': rng.uniform(-15, 10),
+        'feels_like_c': rng.uniform(-20, 10),
+        'humidity_pct': rng.uniform(0, 100),
+        'wind_speed_kmh': rng.uniform(0, 80),
+        'precipitation_type': rng.choice(['none', 'rain', 'sleet', 'snow']),
+        'precipitation_prob_pct': rng.uniform(0, 100),
+        'road_surface_temp_c': rng.uniform(-15, 10),
+        'forecast_min_temp_c': rng.uniform(-20, 5),
+    })
+    for _ in range(5000)
+]
+
+
+def sklearn_salt_amounts(inputs):
+    """Salt amounts from the pickled sklearn regressor, truncated to kg as the API reports them."""
+    features = [
+        predictor._encode_features(route_id, route_service.route_lookup[route_id], weather)
+        for route_id, weather in inputs
+    ]
+    X = np.array([[f[col] for col in predictor.feature_cols] for f in features], dtype=np.float32)
+    return [int(amount) for amount in amount_model.predict(X)]
+
+
+for test_number, (name, inputs) in enumerate((('training', training_inputs), ('random', random_inputs)), start=1):
+    print(f"\n{test_number}. Testing salt amounts on {len(inputs)} {name} inputs...")
+    expected = sklearn_salt_amounts(inputs)
+    batch_results = predictor.predict_batch([
+        (route_id, route_service.route_lookup[route_id], weather) for route_id, weather in inputs
+    ])
+
+    gritted = 0
+    for (route_id, weather), batch_result, expected_amount in zip(inputs, batch_results, expected):
+        result = predictor.predict(route_id, weather)
+        assert result == batch_result, f"predict and predict_batch differ for {route_id}: {weather}"
+        if result['gritting_decision'] == 'yes':
+            gritted += 1
+            assert result['salt_amount_kg'] == expected_amount, (
+                f"salt_amount_kg {result['salt_amount_kg']} != sklearn {expected_amount} for {route_id}: {weather}"
+            )
+    assert gritted > 0, "Expected some gritted predictions"
+    print(f"   ✓ {gritted} gritted predictions match sklearn salt amounts")
+
+print("\n" + "=" * 70)
+print("✓ ALL ONNX PARITY TESTS PASSED")
+print("=" * 70)
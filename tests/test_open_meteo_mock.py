@@ -4,7 +4,9 @@ Unit test for Open-Meteo weather service (with mocked HTTP responses)
 import json
 from unittest.mock import Mock, patch
 
-from open_meteo_weather_service import OpenMeteoWeatherService
+from urllib3.exceptions import ReadTimeoutError
+
+from open_meteo_weather_service import OpenMeteoWeatherService, OpenMeteoWeatherServiceError
 
 # Mock response data from Open-Meteo API
 mock_response_data = {
@@ -29,8 +31,8 @@ mock_response_data = {
 print("Testing Open-Meteo Weather Service (mocked)")
 print("=" * 60)
 
-# Mock the requests.get call
-with patch('open_meteo_weather_service.requests.get') as mock_get:
+# Mock the pooled session's get call
+with patch('open_meteo_weather_service.requests.Session.get') as mock_get:
     # Configure mock
     mock_response = Mock()
     mock_response.status_code = 200
@@ -69,3 +71,48 @@ with patch('open_meteo_weather_service.requests.get') as mock_get:
         print(f"\n✗ Test failed: {e}")
         import traceback
         traceback.print_exc()
+
+# Mock a multi-location response (one result per requested location)
+with patch('open_meteo_weather_service.requests.Session.get') as mock_get:
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = [mock_response_data, mock_response_data]
+    mock_get.return_value = mock_response
+    
+    service = OpenMeteoWeatherService()
+    
+    try:
+        batch = service.fetch_weather_batch([(55.9533, -3.1883), (55.9500, -3.2000)])
+        
+        assert len(batch) == 2, "Expected one result per location"
+        assert mock_get.call_count == 1, "All locations should be fetched in one request"
+        assert mock_get.call_args.kwargs['params']['latitude'] == '55.9533,55.95', "Latitudes should be comma-separated"
+        assert all(w == weather_data for w in batch), "Batch results should match single-location parsing"
+        
+        print("\n✓ Multi-location fetch test passed!")
+        
+    except Exception as e:
+        print(f"\n✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+# Mock a read timeout below the session's retry layer
+with patch('urllib3.connectionpool.HTTPConnectionPool._make_request') as mock_make_request:
+    mock_make_request.side_effect = ReadTimeoutError(None, OpenMeteoWeatherService.BASE_URL, "Read timed out.")
+    
+    service = OpenMeteoWeatherService()
+    
+    try:
+        try:
+            service.fetch_weather(55.9533, -3.1883)
+            raise AssertionError("Expected a timeout error")
+        except OpenMeteoWeatherServiceError as e:
+            assert str(e) == "Weather API request timed out", f"Timeout mapped to: {e}"
+        assert mock_make_request.call_count == 1, "Read timeouts should not be retried"
+        
+        print("\n✓ Read timeout test passed!")
+        
+    except Exception as e:
+        print(f"\n✗ Test failed: {e}")
+        import traceback
+        traceback.print_exc()